@@ -0,0 +1,55 @@
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from fastapi.middleware.cors import CORSMiddleware
+from database import init_db, close_db
+from deps import cloth_change_api
+from http_clients import http_client
+from routes import router, MAX_UPLOAD_BYTES
+from services.executions import execution_poller, cancel_background_tasks
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    execution_poller.start()
+    yield
+    await execution_poller.stop()
+    await cancel_background_tasks()
+    await close_db()
+    await cloth_change_api.aclose()
+    await http_client.aclose()
+
+def create_app() -> FastAPI:
+    """Create the ClothAI FastAPI application"""
+    app = FastAPI(
+        title="ClothAI API",
+        description="API for cloth changing service",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
+    )
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.middleware("http")
+    async def limit_upload_size(request: Request, call_next):
+        """Reject oversized /change-cloth bodies before the multipart form is parsed"""
+        if request.url.path == "/change-cloth":
+            content_length = request.headers.get("content-length")
+            # Two images plus some room for the multipart framing
+            if content_length and content_length.isdigit() and int(content_length) > 2 * MAX_UPLOAD_BYTES + 64 * 1024:
+                logger.error(f"Rejected /change-cloth request with Content-Length {content_length}")
+                return ORJSONResponse(status_code=413, content={"detail": "Request body too large"})
+        return await call_next(request)
+
+    app.include_router(router)
+    return app
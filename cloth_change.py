@@ -1,35 +1,68 @@
 import os
 import time
-import requests
+import random
+import asyncio
+import httpx
+import orjson
+from http_clients import create_async_client
 from dotenv import load_dotenv
 import logging
-import traceback
+from logging_setup import setup_logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+# Gateway errors the idempotent GETs are retried on; the trigger POST is never retried
+RETRY_STATUSES = (502, 503, 504)
+
 class ClothChangeAPI:
     def __init__(self):
-        self.api_key = os.getenv('EACHLABS_API_KEY')
+        self.api_key = os.getenv('EACHLABS_API_KEY', '')
         self.flow_id = '8ea0e2c1-cd76-4ed4-b429-e56103d86715'
         self.base_url = 'https://flows.eachlabs.ai/api/v1'
         self.headers = {
             "X-API-KEY": self.api_key,
         }
+        # One pooled client so the polling loop reuses keep-alive connections
+        self._client = create_async_client(
+            retries=3,
+            base_url=self.base_url,
+            headers=self.headers
+        )
         logger.info("ClothChangeAPI initialized")
 
-    def change_cloth(self, person_image_url, cloth_image_url, clothing_type, webhook_url=''):
+    async def aclose(self):
+        """Close the underlying HTTP client and its pooled connections"""
+        await self._client.aclose()
+
+    async def _get(self, url, retries=3, backoff_factor=0.3):
+        """
+        GET a URL, retrying gateway errors with exponential backoff
+        
+        The transport only retries failed connection attempts, so 502/503/504
+        responses are retried here, waiting backoff_factor * 2 ** attempt seconds.
+        
+        Args:
+            url (str): URL relative to the EachLabs API base URL
+            retries (int): Number of times to retry a gateway error
+            backoff_factor (float): Base delay between retries in seconds
+            
+        Returns:
+            httpx.Response: The last response received
+        """
+        for attempt in range(retries + 1):
+            response = await self._client.get(url)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            delay = backoff_factor * 2 ** attempt
+            logger.warning(f"GET {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def change_cloth(self, person_image_url, cloth_image_url, clothing_type, webhook_url=''):
         """
         Change the cloth in the person image with the provided cloth image
         
@@ -53,28 +86,27 @@ class ClothChangeAPI:
                 "webhook_url": webhook_url
             }
 
-            logger.debug(f"Sending request to EachLabs API")
-            response = requests.post(
-                f"{self.base_url}/{self.flow_id}/trigger",
-                headers=self.headers,
+            logger.debug("Sending request to EachLabs API")
+            response = await self._client.post(
+                f"/{self.flow_id}/trigger",
                 json=payload
             )
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             logger.info(f"Successfully initiated cloth change. Execution ID: {result.get('execution_id', 'unknown')}")
             return result
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             error_msg = f"API Request Error: {str(e)}"
-            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            logger.exception(error_msg)
             raise
         except Exception as e:
             error_msg = f"Unexpected error in change_cloth: {str(e)}"
-            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            logger.exception(error_msg)
             raise
 
-    def get_executions(self):
+    async def get_executions(self):
         """
         Get all executions for the flow
         
@@ -82,21 +114,18 @@ class ClothChangeAPI:
             list: List of executions
         """
         try:
-            logger.debug(f"Getting all executions for flow {self.flow_id}")
-            response = requests.get(
-                f"{self.base_url}/{self.flow_id}/executions",
-                headers=self.headers
-            )
+            logger.debug("Getting all executions for flow %s", self.flow_id)
+            response = await self._get(f"/{self.flow_id}/executions")
             response.raise_for_status()
-            result = response.json()
-            logger.debug(f"Got {len(result)} executions")
+            result = orjson.loads(response.content)
+            logger.debug("Got %d executions", len(result))
             return result
         except Exception as e:
             error_msg = f"Error getting executions: {str(e)}"
-            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            logger.exception(error_msg)
             raise
 
-    def get_execution_details(self, execution_id):
+    async def get_execution_details(self, execution_id):
         """
         Get details of a specific execution
         
@@ -107,61 +136,85 @@ class ClothChangeAPI:
             dict: Execution details
         """
         try:
-            logger.debug(f"Getting execution details for ID: {execution_id}")
-            response = requests.get(
-                f"{self.base_url}/{self.flow_id}/executions/{execution_id}",
-                headers=self.headers
-            )
+            logger.debug("Getting execution details for ID: %s", execution_id)
+            response = await self._get(f"/{self.flow_id}/executions/{execution_id}")
             response.raise_for_status()
-            result = response.json()
-            logger.debug(f"Execution status: {result.get('status', 'unknown')}")
+            result = orjson.loads(response.content)
+            logger.debug("Execution status: %s", result.get('status', 'unknown'))
             return result
             
         except Exception as e:
             error_msg = f"Error getting execution details: {str(e)}"
-            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            logger.exception(error_msg)
             raise
 
-    def wait_for_execution(self, execution_id, max_retries=30, delay=5):
+    async def wait_for_execution(self, execution_id, timeout=150, poll_delay=0.2, max_poll_delay=10,
+                                 error_delay=1, max_error_delay=60):
         """
         Wait for an execution to complete and get its results
         
+        "Still running" and "request failed" back off separately. Status checks
+        start after poll_delay and slow down by 1.3x up to max_poll_delay, so
+        quick executions are picked up fast. Request errors wait error_delay,
+        doubling up to max_error_delay, so a flaky upstream isn't hammered;
+        the error delay resets after the next successful check. All sleeps
+        are jittered.
+        
         Args:
             execution_id (str): ID of the execution to check
-            max_retries (int): Maximum number of times to check status
-            delay (int): Delay between status checks in seconds
+            timeout (float): Maximum total time to wait in seconds
+            poll_delay (float): Initial delay between status checks in seconds
+            max_poll_delay (float): Upper bound for the delay between status checks in seconds
+            error_delay (float): Initial delay after a failed request in seconds
+            max_error_delay (float): Upper bound for the delay after failed requests in seconds
             
         Returns:
             dict: Execution details with results
         """
         logger.info(f"Starting to wait for execution {execution_id}")
         
-        for attempt in range(max_retries):
+        deadline = time.monotonic() + timeout
+        next_poll_delay = poll_delay
+        next_error_delay = error_delay
+        wait = poll_delay
+        attempt = 0
+        
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(wait * (0.5 + random.random()), remaining))
+            attempt += 1
+            
             try:
-                execution = self.get_execution_details(execution_id)
-                status = execution.get('status', '').lower()
-                logger.info(f"Execution {execution_id} status: {status} (attempt {attempt + 1}/{max_retries})")
-                
-                if status == 'succeeded':
-                    logger.info(f"Execution {execution_id} completed successfully")
-                    return execution
-                elif status in ['failed', 'error']:
-                    error_msg = f"Execution failed: {execution.get('error', 'Unknown error')}"
-                    logger.error(f"Execution {execution_id} failed: {error_msg}")
-                    raise Exception(error_msg)
-                
-                time.sleep(delay)
-                
-            except requests.exceptions.RequestException as e:
+                execution = await self.get_execution_details(execution_id)
+            except (httpx.HTTPError, orjson.JSONDecodeError) as e:
                 error_msg = f"Error checking execution status: {str(e)}"
-                logger.error(f"{error_msg}\n{traceback.format_exc()}")
-                time.sleep(delay)
+                logger.exception(error_msg)
+                wait = next_error_delay
+                next_error_delay = min(next_error_delay * 2, max_error_delay)
+                continue
+            
+            next_error_delay = error_delay
+            status = (execution.get('status') or '').lower()
+            logger.info(f"Execution {execution_id} status: {status} (attempt {attempt})")
+            
+            if status == 'succeeded':
+                logger.info(f"Execution {execution_id} completed successfully")
+                return execution
+            elif status in ['failed', 'error']:
+                error_msg = f"Execution failed: {execution.get('error', 'Unknown error')}"
+                logger.error(f"Execution {execution_id} failed: {error_msg}")
+                raise Exception(error_msg)
+            
+            next_poll_delay = min(next_poll_delay * 1.3, max_poll_delay)
+            wait = next_poll_delay
         
-        error_msg = f"Timeout waiting for execution {execution_id} after {max_retries} attempts"
+        error_msg = f"Timeout waiting for execution {execution_id} after {timeout} seconds ({attempt} attempts)"
         logger.error(error_msg)
         raise TimeoutError(error_msg)
 
-def main():
+async def main():
     # Example usage
     api = ClothChangeAPI()
     
@@ -170,17 +223,19 @@ def main():
         person_image_url = "url/to/person.jpg"
         cloth_image_url = "url/to/cloth.jpg"
         
-        result = api.change_cloth(person_image_url, cloth_image_url)
+        result = await api.change_cloth(person_image_url, cloth_image_url)
         logger.info(f"API Response: {result}")
         
         execution_id = result.get('execution_id')
         if execution_id:
-            execution = api.wait_for_execution(execution_id)
+            execution = await api.wait_for_execution(execution_id)
             logger.info(f"Execution Details: {execution}")
         
     except Exception as e:
         error_msg = f"Failed to process images: {str(e)}"
-        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        logger.exception(error_msg)
+    finally:
+        await api.aclose()
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
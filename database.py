@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import aiosqlite
+import orjson
+from aiosqlitepool import SQLiteConnectionPool
 from datetime import datetime
 import os
 
@@ -8,34 +8,139 @@ import os
 DB_PATH = os.getenv('SQLITE_DB_PATH', './clothai.db')
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
-# Create database engine
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
-
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Create Base class
-Base = declarative_base()
-
-class DeviceTryCount(Base):
-    __tablename__ = "device_try_counts"
-
-    id = Column(Integer, primary_key=True, index=True)
-    device_id = Column(String, unique=True, index=True)
-    try_count_left = Column(Integer, default=3)
-    last_updated = Column(DateTime, default=datetime.utcnow)
-
-# Create all tables
-Base.metadata.create_all(bind=engine)
-
-# Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Same layout SQLAlchemy created for DeviceTryCount, so existing databases keep working
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS device_try_counts (
+    id INTEGER NOT NULL PRIMARY KEY,
+    device_id VARCHAR,
+    try_count_left INTEGER DEFAULT 3,
+    last_updated DATETIME
+);
+CREATE INDEX IF NOT EXISTS ix_device_try_counts_id ON device_try_counts (id);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_device_try_counts_device_id ON device_try_counts (device_id);
+-- Covers the /devices listing so it is served from the index without table lookups
+CREATE INDEX IF NOT EXISTS idx_device_last_updated ON device_try_counts (last_updated DESC, device_id, try_count_left);
+CREATE TABLE IF NOT EXISTS executions (
+    execution_id VARCHAR NOT NULL PRIMARY KEY,
+    status VARCHAR,
+    result TEXT,
+    last_updated DATETIME
+);
+CREATE TABLE IF NOT EXISTS change_requests (
+    request_id VARCHAR NOT NULL PRIMARY KEY,
+    status VARCHAR,
+    execution_id VARCHAR,
+    error TEXT,
+    last_updated DATETIME
+);
+"""
+
+# Pooled connections; handlers hold one only around their queries, never across upstream calls
+POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', '10'))
+
+# Connection pool, created on application startup
+pool = None
+
+def utc_timestamp():
+    """Current UTC time in the format SQLAlchemy used for DATETIME columns"""
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def parse_timestamp(value):
+    """Turn a stored DATETIME column back into a datetime, as SQLAlchemy returned it"""
+    return datetime.fromisoformat(value) if value else None
+
+async def connect():
+    """Open a connection with the per-connection PRAGMAs applied"""
+    conn = await aiosqlite.connect(DB_PATH)
+    conn.row_factory = aiosqlite.Row
+    # WAL lets readers run alongside the writer and NORMAL skips the extra fsync per commit
+    await conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-64000;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA busy_timeout=5000;
+    """)
+    return conn
+
+async def init_db():
+    """Create the tables and the connection pool"""
+    global pool
+    async with aiosqlite.connect(DB_PATH) as conn:
+        await conn.executescript(SCHEMA)
+        await conn.commit()
+    pool = SQLiteConnectionPool(connect, pool_size=POOL_SIZE)
+
+async def close_db():
+    """Close all pooled connections"""
+    if pool is not None:
+        await pool.close()
+
+async def get_execution(conn, execution_id):
+    """Return the stored /status response for an execution, or None"""
+    async with conn.execute(
+        "SELECT result FROM executions WHERE execution_id = ?", (execution_id,)
+    ) as cursor:
+        row = await cursor.fetchone()
+    return orjson.loads(row["result"]) if row else None
+
+async def save_execution(conn, execution_id, status, result):
+    """Store the /status response for an execution"""
+    await conn.execute(
+        """
+        INSERT INTO executions (execution_id, status, result, last_updated) VALUES (?, ?, ?, ?)
+        ON CONFLICT(execution_id) DO UPDATE SET
+            status = excluded.status,
+            result = excluded.result,
+            last_updated = excluded.last_updated
+        """,
+        (execution_id, status, orjson.dumps(result).decode(), utc_timestamp())
+    )
+    await conn.commit()
+
+async def get_change_request(conn, request_id):
+    """Return the stored state of a /change-cloth request, or None"""
+    async with conn.execute(
+        "SELECT request_id, status, execution_id, error FROM change_requests WHERE request_id = ?",
+        (request_id,)
+    ) as cursor:
+        row = await cursor.fetchone()
+    return dict(row) if row else None
+
+async def create_change_request(conn, request_id):
+    """Store a new pending /change-cloth request, returning False if the ID is already taken"""
+    # A single INSERT claims the ID atomically, so concurrent duplicates can't both pass
+    cursor = await conn.execute(
+        """
+        INSERT INTO change_requests (request_id, status, last_updated) VALUES (?, 'pending', ?)
+        ON CONFLICT(request_id) DO NOTHING
+        """,
+        (request_id, utc_timestamp())
+    )
+    await conn.commit()
+    return cursor.rowcount == 1
+
+async def save_change_request(conn, request_id, status, execution_id=None, error=None):
+    """Store the state of a /change-cloth request"""
+    await conn.execute(
+        """
+        INSERT INTO change_requests (request_id, status, execution_id, error, last_updated) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(request_id) DO UPDATE SET
+            status = excluded.status,
+            execution_id = excluded.execution_id,
+            error = excluded.error,
+            last_updated = excluded.last_updated
+        """,
+        (request_id, status, execution_id, error, utc_timestamp())
+    )
+    await conn.commit()
+
+def connection():
+    """Borrow a pooled connection outside of a request, e.g. from a background task"""
+    return pool.connection()
+
+# Dependency to get a pooled database connection
+async def get_db():
+    async with pool.connection() as conn:
+        yield conn
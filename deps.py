@@ -0,0 +1,29 @@
+import os
+from dotenv import load_dotenv
+from fastapi import HTTPException, Header
+from fastapi.security import APIKeyHeader
+from cloth_change import ClothChangeAPI
+
+# Load environment variables
+load_dotenv()
+
+IMGBB_API_KEY = os.getenv('IMGBB_API_KEY')
+
+# Public URL of this server; when set, EachLabs pushes results to /webhook/eachlabs
+PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', '').rstrip('/')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+
+# Initialize the ClothChangeAPI
+cloth_change_api = ClothChangeAPI()
+
+# API Key security
+API_KEY = os.getenv('MOBILE_API_KEY', 'your_mobile_api_key')  # Set this in .env file
+api_key_header = APIKeyHeader(name="X-API-Key")
+
+async def verify_api_key(api_key: str = Header(..., alias="X-API-Key")):
+    if api_key != API_KEY:
+        raise HTTPException(
+            status_code=403,
+            detail="Invalid API key"
+        )
+    return api_key
@@ -0,0 +1,132 @@
+import asyncio
+import time
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which an execution never changes again
+TERMINAL_STATUSES = ('succeeded', 'failed', 'error')
+
+class ExecutionPoller:
+    """
+    Track the status of many executions with a single /executions request per tick.
+
+    Instead of every pending job polling EachLabs on its own, the poller lists
+    the flow's executions once per interval and keeps the latest snapshot of
+    each tracked execution. It sleeps while nothing is tracked.
+    """
+
+    def __init__(self, api, on_finished: Callable[[str], Awaitable[None]], interval=1.0, max_age=3600):
+        """
+        Args:
+            api (ClothChangeAPI): Client used to list executions
+            on_finished (callable): Coroutine function called with the execution ID
+                once an execution reaches a terminal status
+            interval (float): Seconds between /executions requests
+            max_age (float): Seconds after which an execution that never finished
+                is no longer tracked
+        """
+        self.api = api
+        self.on_finished = on_finished
+        self.interval = interval
+        self.max_age = max_age
+        # Tracked execution IDs and when tracking started
+        self.pending_ids: Dict[str, float] = {}
+        # Latest execution seen for each tracked ID and when it was seen
+        self.snapshots: Dict[str, Tuple[dict, float]] = {}
+        self._wakeup = None
+        self._task = None
+        # Running on_finished calls, kept so they aren't garbage collected mid-run
+        self._handlers: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Start the background polling task"""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Execution poller started")
+
+    async def stop(self):
+        """Stop the background polling task and any running on_finished calls"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for handler in list(self._handlers):
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    def track(self, execution_id):
+        """Include an execution in the batched polling until it finishes"""
+        if execution_id not in self.pending_ids:
+            self.pending_ids[execution_id] = time.monotonic()
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def latest(self, execution_id) -> Optional[dict]:
+        """Return the latest polled execution, or None if there is no recent snapshot"""
+        snapshot = self.snapshots.get(execution_id)
+        if snapshot is None:
+            return None
+        execution, seen_at = snapshot
+        # Don't serve snapshots that stopped updating, e.g. while EachLabs is unreachable
+        if time.monotonic() - seen_at > 5 * self.interval:
+            return None
+        return execution
+
+    def _untrack(self, execution_id):
+        self.pending_ids.pop(execution_id, None)
+        self.snapshots.pop(execution_id, None)
+
+    async def _run(self):
+        while True:
+            if not self.pending_ids:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            # A bad response must never end the loop, or tracked executions stop updating
+            try:
+                executions = await self.api.get_executions()
+                await self._dispatch(executions)
+            except Exception:
+                logger.exception("Failed to poll executions")
+
+            await asyncio.sleep(self.interval)
+
+    async def _dispatch(self, executions):
+        # Accept the list both bare and wrapped as {"executions": [...]}
+        if isinstance(executions, dict):
+            executions = executions.get('executions')
+        if not isinstance(executions, list):
+            raise ValueError(f"Unexpected /executions response: {type(executions).__name__}")
+
+        now = time.monotonic()
+        finished = []
+        for execution in executions:
+            if not isinstance(execution, dict):
+                continue
+            execution_id = execution.get('execution_id')
+            if execution_id not in self.pending_ids:
+                continue
+            self.snapshots[execution_id] = (execution, now)
+            if (execution.get('status') or '').lower() in TERMINAL_STATUSES:
+                finished.append(execution_id)
+
+        for execution_id, tracked_at in list(self.pending_ids.items()):
+            if now - tracked_at > self.max_age and execution_id not in finished:
+                logger.warning(f"Execution {execution_id} did not finish within {self.max_age}s, no longer tracking it")
+                self._untrack(execution_id)
+
+        # Each on_finished call fetches and stores a result, so run them off the
+        # polling loop rather than delaying the next tick for every other execution
+        for execution_id in finished:
+            self._untrack(execution_id)
+            handler = asyncio.create_task(self._finish(execution_id))
+            self._handlers.add(handler)
+            handler.add_done_callback(self._handlers.discard)
+
+    async def _finish(self, execution_id):
+        try:
+            await self.on_finished(execution_id)
+        except Exception:
+            logger.exception(f"Failed to handle finished execution {execution_id}")
@@ -0,0 +1,22 @@
+import httpx
+
+# Connection pool and timeouts shared by all outbound clients
+LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30)
+TIMEOUT = httpx.Timeout(connect=5, read=30, write=30, pool=5)
+
+def create_async_client(retries=0, **kwargs):
+    """
+    Create an HTTP/2 client that keeps connections alive between requests.
+
+    Args:
+        retries (int): Number of times to retry failed connection attempts
+        **kwargs: Extra arguments for httpx.AsyncClient, e.g. base_url or headers
+
+    Returns:
+        httpx.AsyncClient: The configured client
+    """
+    transport = httpx.AsyncHTTPTransport(http2=True, retries=retries, limits=LIMITS)
+    return httpx.AsyncClient(transport=transport, timeout=TIMEOUT, **kwargs)
+
+# Shared client for ImgBB uploads and output image downloads
+http_client = create_async_client(follow_redirects=True)
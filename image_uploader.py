@@ -1,5 +1,7 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 class ImageUploader:
     def __init__(self, api_key):
@@ -11,6 +13,21 @@ class ImageUploader:
         """
         self.api_key = api_key
         self.upload_url = "https://api.imgbb.com/1/upload"
+        
+        # Reuse connections across uploads instead of a new handshake per call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            # POST isn't retried by default; a repeated upload at worst hosts a duplicate image
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=frozenset({'POST'})
+            )
+        )
+        self.session.mount('https://', adapter)
     
     def upload_image(self, image_path):
         """
@@ -30,7 +47,7 @@ class ImageUploader:
                 files = {'image': image_file}
                 params = {'key': self.api_key}
                 
-                response = requests.post(
+                response = self.session.post(
                     self.upload_url,
                     params=params,
                     files=files
@@ -0,0 +1,60 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import re
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Token query parameters, e.g. the webhook secret EachLabs calls back with
+TOKEN_PATTERN = re.compile(r'([?&]token=)[^&\s]*')
+
+class RedactTokenFilter(logging.Filter):
+    """Hide token query parameters in uvicorn's access log lines"""
+
+    def filter(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                TOKEN_PATTERN.sub(r'\1[redacted]', arg) if isinstance(arg, str) else arg
+                for arg in record.args
+            )
+        return True
+
+# Background listener that writes queued records, started once per process
+_listener = None
+
+def setup_logging(level=logging.INFO):
+    """
+    Configure root logging to write to app.log and the console.
+
+    Callers only put records on a queue; a QueueListener thread does the
+    actual file and console writes. Safe to call more than once, and a no-op
+    when the root logger already has handlers, so records are never written
+    twice and app.log isn't reopened on every import. Token query parameters
+    are always redacted from uvicorn's access log.
+    """
+    global _listener
+    access_logger = logging.getLogger('uvicorn.access')
+    if not any(isinstance(f, RedactTokenFilter) for f in access_logger.filters):
+        access_logger.addFilter(RedactTokenFilter())
+
+    if _listener is not None or logging.getLogger().handlers:
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.FileHandler('app.log')
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    # The listener's handlers add the timestamp and level, the queue only carries the message
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=level, handlers=[queue_handler])
@@ -0,0 +1,266 @@
+import logging
+import re
+import tempfile
+from secrets import compare_digest, token_hex
+import aiosqlite
+import orjson
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Header, Request, Query
+from pydantic import BaseModel
+from database import connection, get_db, utc_timestamp, parse_timestamp, get_execution, get_change_request, create_change_request
+from deps import cloth_change_api, verify_api_key, PUBLIC_BASE_URL, WEBHOOK_SECRET
+from execution_poller import TERMINAL_STATUSES
+from services.executions import (
+    terminal_results, execution_poller, run_in_background, record_execution, finish_execution,
+    process_change_request
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Largest accepted image upload
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+# Client-supplied X-Request-ID values we accept; anything else gets a generated ID
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+def is_supported_image(head: bytes) -> bool:
+    """Check the leading bytes of a file against the image formats we accept"""
+    return (
+        head.startswith(b'\x89PNG\r\n\x1a\n')
+        or head.startswith(b'\xff\xd8\xff')
+        or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+        or (head[4:8] == b'ftyp' and head[8:12] in (b'heic', b'heix', b'mif1'))
+    )
+
+async def validate_image(file: UploadFile, name: str, request_id: str):
+    """Reject an upload that is too large or isn't a PNG, JPEG, WEBP or HEIC image"""
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        status_code = 413
+        error_msg = f"{name} file must be smaller than {MAX_UPLOAD_BYTES // (1024 * 1024)}MB"
+    else:
+        head = await file.read(16)
+        await file.seek(0)
+        if is_supported_image(head):
+            return
+        status_code = 400
+        error_msg = f"{name} file must be an image"
+    
+    logger.error(f"[{request_id}] Validation error: {error_msg}")
+    raise HTTPException(status_code=status_code, detail=error_msg)
+
+async def spool_upload(file: UploadFile) -> UploadFile:
+    """Copy an upload into a spooled file the background task can own past the response"""
+    # Stays in memory up to 1MB and moves to disk beyond that, like Starlette's own uploads
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    while chunk := await file.read(64 * 1024):
+        spooled.write(chunk)
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename=file.filename, headers=file.headers)
+
+class TryCountRequest(BaseModel):
+    device_id: str
+    try_count: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "device_id": "device123",
+                "try_count": 3
+            }
+        }
+
+@router.post("/change-cloth")
+async def change_cloth(
+    request: Request,
+    person: UploadFile = File(...),
+    cloth: UploadFile = File(...),
+    clothing_type: str = "",
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Change cloth in the person image with the provided cloth image.
+    Both images should be uploaded as form-data with keys 'person' and 'cloth'.
+    
+    The uploads and the EachLabs trigger run in the background; poll
+    /status/{request_id} until the cloth change has finished.
+    """
+    request_id = request.headers.get("x-request-id", "")
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = token_hex(6)
+    logger.info(f"[{request_id}] New cloth change request received")
+    await validate_image(person, "Person", request_id)
+    await validate_image(cloth, "Cloth", request_id)
+    
+    # Borrow a connection only for the queries, not while the uploads are spooled
+    async with connection() as db:
+        created = await create_change_request(db, request_id)
+    if not created:
+        error_msg = f"Request {request_id} already exists"
+        logger.error(f"[{request_id}] {error_msg}")
+        raise HTTPException(status_code=409, detail=error_msg)
+    
+    # The uploaded files are closed once the response is sent, so hand
+    # spooled copies to the background task, which closes them when done
+    person_file = await spool_upload(person)
+    cloth_file = await spool_upload(cloth)
+    run_in_background(process_change_request(request_id, person_file, cloth_file, clothing_type))
+    
+    logger.info(f"[{request_id}] Cloth change queued")
+    # execution_id is kept for clients that poll /status with that field
+    return {"request_id": request_id, "execution_id": request_id, "status": "pending"}
+
+@router.get("/status/{execution_id}")
+async def get_execution_status(
+    execution_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get the status of a cloth change execution.
+    
+    Args:
+        execution_id: The ID of the execution to check
+        
+    Returns:
+        dict: Execution details including status and results if available
+    """
+    logger.info(f"Status check requested for execution: {execution_id}")
+    
+    # The connection is released before EachLabs is asked, so slow upstream
+    # calls can't hold up the pool for the other endpoints
+    async with connection() as db:
+        # IDs returned by /change-cloth resolve to the EachLabs execution once it is triggered
+        change_request = await get_change_request(db, execution_id)
+        if change_request is not None:
+            if change_request['execution_id'] is None:
+                logger.info(f"Request {execution_id} is {change_request['status']}")
+                return {
+                    "execution_id": execution_id,
+                    "status": change_request['status'],
+                    "details": {"error": change_request['error']} if change_request['error'] else {}
+                }
+            execution_id = change_request['execution_id']
+        
+        # Finished executions never change, so answer from the cache when possible
+        cached = terminal_results.get(execution_id)
+        if cached is None:
+            cached = await get_execution(db, execution_id)
+            if cached is not None:
+                terminal_results[execution_id] = cached
+    if cached is not None:
+        logger.info(f"Returning cached {cached['status']} status for execution {execution_id}")
+        return cached
+    
+    # Running executions are answered from the batched poller instead of a request per poll
+    snapshot = execution_poller.latest(execution_id)
+    if snapshot is not None:
+        status = (snapshot.get('status') or '').lower()
+        logger.info(f"Status for execution {execution_id} from poller: {status}")
+        if status not in TERMINAL_STATUSES:
+            return {
+                "execution_id": execution_id,
+                "status": status,
+                "details": snapshot
+            }
+    
+    try:
+        result = await cloth_change_api.get_execution_details(execution_id)
+        response = await record_execution(execution_id, result)
+        logger.info(f"Status for execution {execution_id}: {response['status']}")
+        # Only known, still running executions join the batched polling
+        if response['status'] not in TERMINAL_STATUSES:
+            execution_poller.track(execution_id)
+        return response
+        
+    except Exception as e:
+        error_msg = f"Error checking execution status: {str(e)}"
+        logger.exception(f"Error for execution {execution_id}: {error_msg}")
+        raise HTTPException(status_code=500, detail=error_msg)
+
+@router.post("/webhook/eachlabs")
+async def eachlabs_webhook(
+    request: Request,
+    token: str = "",
+    webhook_token: str = Header("", alias="X-Webhook-Token")
+):
+    """
+    Receive execution notifications pushed by EachLabs.
+    
+    The secret is accepted as the token query parameter or the X-Webhook-Token
+    header. The body is only taken as a hint that an execution finished; its
+    result is fetched from EachLabs and stored so /status can answer without polling.
+    """
+    # Only served when webhooks are configured, and then only with the secret
+    if not (PUBLIC_BASE_URL and WEBHOOK_SECRET):
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Compare bytes, compare_digest rejects non-ASCII str
+    if not compare_digest((webhook_token or token).encode(), WEBHOOK_SECRET.encode()):
+        raise HTTPException(status_code=403, detail="Invalid webhook token")
+    
+    try:
+        result = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    
+    execution_id = result.get('execution_id') if isinstance(result, dict) else None
+    if not execution_id or not isinstance(execution_id, str):
+        raise HTTPException(status_code=400, detail="Missing execution_id")
+    
+    status = (result.get('status') or '').lower()
+    logger.info(f"Webhook received for execution {execution_id}: {status}")
+    if status in TERMINAL_STATUSES:
+        run_in_background(finish_execution(execution_id))
+    return {"received": True}
+
+@router.get("/try-count/{device_id}")
+async def get_try_count(
+    device_id: str, 
+    db: aiosqlite.Connection = Depends(get_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """Get the remaining try count for a device"""
+    async with db.execute(
+        "SELECT try_count_left FROM device_try_counts WHERE device_id = ?", (device_id,)
+    ) as cursor:
+        device = await cursor.fetchone()
+    if not device:
+        return {"device_id": device_id, "try_count_left": None}
+    return {"device_id": device_id, "try_count_left": device["try_count_left"]}
+
+@router.post("/try-count")
+async def update_try_count(request: TryCountRequest, db: aiosqlite.Connection = Depends(get_db), api_key: str = Depends(verify_api_key)):
+    """Update try count for a device"""
+    try:
+        await db.execute(
+            """
+            INSERT INTO device_try_counts (device_id, try_count_left, last_updated) VALUES (?, ?, ?)
+            ON CONFLICT(device_id) DO UPDATE SET
+                try_count_left = excluded.try_count_left,
+                last_updated = excluded.last_updated
+            """,
+            (request.device_id, request.try_count, utc_timestamp())
+        )
+        await db.commit()
+        return {"device_id": request.device_id, "try_count_left": request.try_count}
+    except Exception as e:
+        logger.error(f"Error updating try count: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/devices")
+async def get_devices(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: aiosqlite.Connection = Depends(get_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """Get devices, most recently updated first"""
+    async with db.execute(
+        """
+        SELECT id, device_id, try_count_left, last_updated FROM device_try_counts
+        ORDER BY last_updated DESC LIMIT ? OFFSET ?
+        """,
+        (limit, offset)
+    ) as cursor:
+        rows = await cursor.fetchall()
+    # Serialized as ISO-8601 like the ORM datetimes this endpoint used to return
+    return [{**dict(row), "last_updated": parse_timestamp(row["last_updated"])} for row in rows]
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+from fastapi import UploadFile
+from database import connection, save_execution, save_change_request
+from deps import cloth_change_api, PUBLIC_BASE_URL, WEBHOOK_SECRET
+from execution_poller import ExecutionPoller, TERMINAL_STATUSES
+from services.imgbb import upload_to_imgbb, mirror_output
+
+logger = logging.getLogger(__name__)
+
+class LRUCache(OrderedDict):
+    """Dict that keeps only the most recently used max_size entries"""
+
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
+
+# /status responses of recently finished executions, keyed by execution ID;
+# older ones are still served from the executions table
+terminal_results: Dict[str, dict] = LRUCache(max_size=5000)
+
+# Execution IDs whose output is currently being mirrored to ImgBB
+mirroring: Set[str] = set()
+
+# Cloth change requests uploading and triggering at the same time; the rest wait
+# their turn so a burst of requests doesn't hold every upload open at once
+MAX_CONCURRENT_CHANGE_REQUESTS = 8
+# Created on first use, since before Python 3.10 a Semaphore binds to the event
+# loop current at creation, which isn't the serving loop at import time
+change_request_slots: Optional[asyncio.Semaphore] = None
+
+def get_change_request_slots() -> asyncio.Semaphore:
+    """Return the semaphore limiting concurrent change requests"""
+    global change_request_slots
+    if change_request_slots is None:
+        change_request_slots = asyncio.Semaphore(MAX_CONCURRENT_CHANGE_REQUESTS)
+    return change_request_slots
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-run
+background_tasks: Set[asyncio.Task] = set()
+
+def run_in_background(coro):
+    """Run a coroutine detached from the current request"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def cancel_background_tasks():
+    """Cancel detached tasks that are still running, e.g. on shutdown"""
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+async def store_mirrored_output(execution_id: str, response: dict):
+    """Mirror a succeeded execution's output to ImgBB and cache the final /status response"""
+    try:
+        try:
+            imgbb_url = await mirror_output(execution_id, response['details']['output_url'])
+            logger.info(f"Output image uploaded to ImgBB: {imgbb_url}")
+            response = {**response, "details": {**response['details'], "output_url": imgbb_url}}
+        except Exception:
+            # Keep serving the EachLabs URL instead of retrying the mirror on every poll
+            logger.exception(f"Failed to mirror output of execution {execution_id}")
+        async with connection() as db:
+            await save_execution(db, execution_id, 'succeeded', response)
+        terminal_results[execution_id] = response
+    except Exception:
+        logger.exception(f"Failed to store result of execution {execution_id}")
+    finally:
+        mirroring.discard(execution_id)
+
+async def record_execution(execution_id: str, result: dict) -> dict:
+    """Build the /status response for EachLabs execution details and cache it once finished"""
+    status = (result.get('status') or '').lower()
+    response = {
+        "execution_id": execution_id,
+        "status": status,
+        "details": result
+    }
+    output_url = result.get('output', '') if status == 'succeeded' else ''
+    if output_url:
+        logger.info(f"Execution {execution_id} completed successfully")
+        output_url = output_url.replace('"', '')
+        logger.info(f"Output URL: {output_url}")
+        result['output_url'] = output_url
+
+        # Answer with the EachLabs URL now and mirror to ImgBB off the request path;
+        # the stored result served to later polls points at the ImgBB copy, or
+        # keeps the EachLabs URL if mirroring failed
+        if execution_id not in mirroring:
+            mirroring.add(execution_id)
+            run_in_background(store_mirrored_output(execution_id, response))
+    elif status in TERMINAL_STATUSES:
+        async with connection() as db:
+            await save_execution(db, execution_id, status, response)
+        terminal_results[execution_id] = response
+    return response
+
+async def finish_execution(execution_id: str):
+    """Fetch and record a finished execution so /status can answer from the cache"""
+    if execution_id in terminal_results:
+        return
+    result = await cloth_change_api.get_execution_details(execution_id)
+    await record_execution(execution_id, result)
+
+# Polls all pending executions with one /executions request per second
+execution_poller = ExecutionPoller(cloth_change_api, on_finished=finish_execution)
+
+def webhook_url() -> str:
+    """URL EachLabs should notify when an execution finishes, empty if not configured"""
+    # The webhook route refuses requests unless both are set
+    if not (PUBLIC_BASE_URL and WEBHOOK_SECRET):
+        return ''
+    return f"{PUBLIC_BASE_URL}/webhook/eachlabs?token={WEBHOOK_SECRET}"
+
+async def process_change_request(request_id: str, person: UploadFile, cloth: UploadFile, clothing_type: str):
+    """Upload both images and trigger the cloth change, recording the outcome for /status"""
+    try:
+        async with get_change_request_slots():
+            await trigger_change_request(request_id, person, cloth, clothing_type)
+    except Exception as e:
+        error_msg = f"Error processing cloth change: {str(e)}"
+        logger.exception(f"[{request_id}] {error_msg}")
+        async with connection() as db:
+            await save_change_request(db, request_id, 'failed', error=error_msg)
+    except asyncio.CancelledError:
+        # e.g. on shutdown; don't leave the request pending forever
+        logger.warning(f"[{request_id}] Cloth change cancelled")
+        async with connection() as db:
+            await save_change_request(db, request_id, 'failed', error="Cloth change was cancelled")
+        raise
+    finally:
+        await person.close()
+        await cloth.close()
+
+async def trigger_change_request(request_id: str, person: UploadFile, cloth: UploadFile, clothing_type: str):
+    """Upload both images, start the EachLabs execution and start tracking it"""
+    logger.info(f"[{request_id}] Uploading person image: {person.filename}, cloth image: {cloth.filename}")
+    uploads = [
+        asyncio.create_task(upload_to_imgbb(person)),
+        asyncio.create_task(upload_to_imgbb(cloth))
+    ]
+    try:
+        person_url, cloth_url = await asyncio.gather(*uploads)
+    except Exception:
+        # Don't leave the sibling upload running once one of them failed
+        for upload in uploads:
+            upload.cancel()
+        raise
+
+    logger.info(f"[{request_id}] Processing cloth change")
+    result = await cloth_change_api.change_cloth(
+        person_image_url=person_url,
+        cloth_image_url=cloth_url,
+        clothing_type=clothing_type,
+        webhook_url=webhook_url()
+    )
+    execution_id = result.get('execution_id')
+    if not execution_id:
+        raise Exception(f"No execution ID in response: {result}")
+
+    logger.info(f"[{request_id}] Successfully initiated cloth change. Execution ID: {execution_id}")
+    execution_poller.track(execution_id)
+    async with connection() as db:
+        await save_change_request(db, request_id, 'triggered', execution_id=execution_id)
@@ -0,0 +1,54 @@
+import logging
+import tempfile
+import orjson
+from fastapi import UploadFile, HTTPException
+from deps import IMGBB_API_KEY
+from http_clients import http_client
+
+logger = logging.getLogger(__name__)
+
+# Largest output image mirrored to ImgBB (ImgBB's own upload limit)
+MAX_OUTPUT_BYTES = 32 * 1024 * 1024
+
+async def upload_to_imgbb(file: UploadFile) -> str:
+    """Upload an image to ImgBB and return the URL"""
+    try:
+        logger.info(f"Starting upload to ImgBB for file: {file.filename}")
+        
+        # Stream the spooled upload as multipart/form-data, no base64 copy needed
+        url = "https://api.imgbb.com/1/upload"
+        files = {"image": (file.filename, file.file, file.content_type)}
+        
+        logger.debug("Sending request to ImgBB API")
+        response = await http_client.post(url, params={"key": IMGBB_API_KEY}, files=files)
+        response.raise_for_status()
+        
+        # Get the image URL
+        result = orjson.loads(response.content)
+        image_url = result["data"]["url"]
+        logger.info(f"Successfully uploaded image to ImgBB: {image_url}")
+        return image_url
+        
+    except Exception as e:
+        error_msg = f"Failed to upload image: {str(e)}"
+        logger.exception(error_msg)
+        raise HTTPException(status_code=500, detail=error_msg)
+
+async def mirror_output(execution_id: str, output_url: str) -> str:
+    """Copy an execution's output image to ImgBB and return the ImgBB URL"""
+    # Stream the image into a spooled file that moves to disk past 1MB,
+    # so memory use doesn't grow with the image size
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spooled:
+        size = 0
+        async with http_client.stream("GET", output_url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(64 * 1024):
+                size += len(chunk)
+                if size > MAX_OUTPUT_BYTES:
+                    raise Exception(f"Output image exceeds {MAX_OUTPUT_BYTES // (1024 * 1024)}MB")
+                spooled.write(chunk)
+        spooled.seek(0)
+        
+        # Upload to ImgBB
+        temp_file = UploadFile(filename=f"output_{execution_id}.png", file=spooled)
+        return await upload_to_imgbb(temp_file)
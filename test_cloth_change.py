@@ -1,4 +1,5 @@
 import os
+import asyncio
 from dotenv import load_dotenv
 from cloth_change import ClothChangeAPI
 from image_uploader import ImageUploader
@@ -6,7 +7,7 @@ from image_uploader import ImageUploader
 # Load environment variables
 load_dotenv()
 
-def main():
+async def main():
     # Initialize the APIs
     cloth_api = ClothChangeAPI()
     image_uploader = ImageUploader(os.getenv('IMGBB_API_KEY'))
@@ -37,14 +38,14 @@ def main():
         
         # Make the cloth change API call
         print("\nTriggering new cloth change execution...")
-        result = cloth_api.change_cloth(person_url, cloth_url)
+        result = await cloth_api.change_cloth(person_url, cloth_url)
         print("Execution triggered:", result)
         
         # Get execution results
         execution_id = result.get('trigger_id')
         if execution_id:
             print("\nWaiting for execution to complete...")
-            execution = cloth_api.wait_for_execution(execution_id)
+            execution = await cloth_api.wait_for_execution(execution_id)
             print("\nFinal execution details:")
             print("Status:", execution.get('status'))
             print("Results:", execution.get('results', {}))
@@ -53,13 +54,15 @@ def main():
             
             # Get detailed execution information
             print("\nGetting detailed execution information...")
-            details = cloth_api.get_execution_details(execution_id)
+            details = await cloth_api.get_execution_details(execution_id)
             print("Execution Details:", details)
         else:
             print("No execution ID returned")
         
     except Exception as e:
         print(f"Error during process: {str(e)}")
+    finally:
+        await cloth_api.aclose()
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
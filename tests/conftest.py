@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# The app modules read their configuration at import time, so set it up first
+os.environ['SQLITE_DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'clothai.db')
+os.environ['MOBILE_API_KEY'] = 'test-api-key'
+os.environ['PUBLIC_BASE_URL'] = ''
+os.environ['WEBHOOK_SECRET'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
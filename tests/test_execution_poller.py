@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from execution_poller import ExecutionPoller
+
+class FakeAPI:
+    """Returns the queued /executions payloads in order, then an empty list"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    async def get_executions(self):
+        return self.responses.pop(0) if self.responses else []
+
+def make_poller(*responses, on_finished=None):
+    finished = []
+
+    async def record(execution_id):
+        finished.append(execution_id)
+
+    poller = ExecutionPoller(FakeAPI(*responses), on_finished=on_finished or record, interval=0.01)
+    return poller, finished
+
+def test_dispatch_accepts_wrapped_list():
+    async def run():
+        poller, finished = make_poller()
+        poller.track('a')
+        await poller._dispatch({"executions": [{"execution_id": "a", "status": "Succeeded"}]})
+        await asyncio.gather(*poller._handlers)
+        return poller, finished
+
+    poller, finished = asyncio.run(run())
+    assert finished == ['a']
+    assert 'a' not in poller.pending_ids
+
+def test_dispatch_skips_malformed_items_and_null_status():
+    async def run():
+        poller, finished = make_poller()
+        poller.track('a')
+        await poller._dispatch([1, "x", None, {"execution_id": "a", "status": None}])
+        return poller, finished
+
+    poller, finished = asyncio.run(run())
+    assert finished == []
+    assert 'a' in poller.pending_ids
+    assert poller.latest('a') == {"execution_id": "a", "status": None}
+
+@pytest.mark.parametrize("payload", [None, "oops", {"error": "rate limited"}])
+def test_dispatch_rejects_unexpected_payload(payload):
+    poller, _ = make_poller()
+    with pytest.raises(ValueError):
+        asyncio.run(poller._dispatch(payload))
+
+def test_run_survives_bad_responses():
+    async def run():
+        poller, finished = make_poller(
+            None,
+            [{"execution_id": "a", "status": None}],
+            {"executions": [{"execution_id": "a", "status": "failed"}]}
+        )
+        poller.start()
+        poller.track('a')
+        for _ in range(100):
+            if finished:
+                break
+            await asyncio.sleep(0.01)
+        await poller.stop()
+        return finished
+
+    assert asyncio.run(run()) == ['a']
+
+def test_slow_on_finished_does_not_block_dispatch():
+    async def run():
+        release = asyncio.Event()
+
+        async def slow(execution_id):
+            await release.wait()
+
+        poller, _ = make_poller(on_finished=slow)
+        poller.track('a')
+        poller.track('b')
+        await asyncio.wait_for(
+            poller._dispatch([
+                {"execution_id": "a", "status": "succeeded"},
+                {"execution_id": "b", "status": "succeeded"}
+            ]),
+            timeout=1
+        )
+        running = len(poller._handlers)
+        release.set()
+        await poller.stop()
+        return running
+
+    assert asyncio.run(run()) == 2
@@ -0,0 +1,108 @@
+import time
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import deps
+import services.imgbb
+from main import app
+from services.executions import execution_poller
+
+HEADERS = {"X-API-Key": deps.API_KEY}
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+OUTPUT_URL = "https://eachlabs.example/output.png"
+IMGBB_URL = "https://i.ibb.co/output.png"
+
+class FakeEachLabs:
+    """MockTransport handler standing in for the EachLabs flow API"""
+
+    def __init__(self):
+        # Execution ID -> status reported for it
+        self.statuses = {}
+        self.triggered = 0
+
+    def execution(self, execution_id):
+        status = self.statuses[execution_id]
+        execution = {"execution_id": execution_id, "status": status}
+        if status == 'succeeded':
+            execution["output"] = f'"{OUTPUT_URL}"'
+        return execution
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST" and path.endswith("/trigger"):
+            self.triggered += 1
+            execution_id = f"exec-{self.triggered}"
+            self.statuses[execution_id] = 'running'
+            return httpx.Response(200, json={"execution_id": execution_id})
+        if path.endswith("/executions"):
+            return httpx.Response(200, json=[self.execution(i) for i in self.statuses])
+        execution_id = path.rsplit("/", 1)[-1]
+        if execution_id not in self.statuses:
+            return httpx.Response(404, json={"error": "not found"})
+        return httpx.Response(200, json=self.execution(execution_id))
+
+def fake_imgbb(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "api.imgbb.com":
+        return httpx.Response(200, json={"data": {"url": IMGBB_URL}})
+    return httpx.Response(200, content=PNG)
+
+@pytest.fixture
+def eachlabs():
+    return FakeEachLabs()
+
+@pytest.fixture
+def client(eachlabs, monkeypatch):
+    monkeypatch.setattr(
+        deps.cloth_change_api, "_client",
+        httpx.AsyncClient(transport=httpx.MockTransport(eachlabs), base_url=deps.cloth_change_api.base_url)
+    )
+    monkeypatch.setattr(services.imgbb, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(fake_imgbb)))
+    with TestClient(app) as client:
+        yield client
+
+def change_cloth(client, request_id=None):
+    headers = {**HEADERS, "X-Request-ID": request_id} if request_id else HEADERS
+    files = {"person": ("person.png", PNG, "image/png"), "cloth": ("cloth.png", PNG, "image/png")}
+    return client.post("/change-cloth", headers=headers, files=files)
+
+def poll_status(client, request_id, until, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        body = client.get(f"/status/{request_id}", headers=HEADERS).json()
+        if until(body) or time.monotonic() > deadline:
+            return body
+        time.sleep(0.05)
+
+def test_status_follows_request_id_to_execution(client, eachlabs):
+    response = change_cloth(client, "req-follow")
+    assert response.status_code == 200
+    assert response.json()["request_id"] == "req-follow"
+
+    body = poll_status(client, "req-follow", lambda body: body["status"] != 'pending')
+    assert body["status"] == 'running'
+    assert body["execution_id"] == "exec-1"
+    assert "exec-1" in execution_poller.pending_ids
+
+    eachlabs.statuses["exec-1"] = 'succeeded'
+    body = poll_status(client, "req-follow", lambda body: body["details"].get("output_url") == IMGBB_URL)
+    assert body["status"] == 'succeeded'
+    assert body["details"]["output_url"] == IMGBB_URL
+    assert eachlabs.triggered == 1
+
+def test_malformed_request_id_is_replaced(client):
+    response = change_cloth(client, "not a valid id!")
+    assert response.status_code == 200
+    request_id = response.json()["request_id"]
+    assert request_id != "not a valid id!"
+    assert len(request_id) == 12
+
+def test_duplicate_request_id_conflicts(client, eachlabs):
+    assert change_cloth(client, "req-dup").status_code == 200
+    assert change_cloth(client, "req-dup").status_code == 409
+    poll_status(client, "req-dup", lambda body: body["status"] != 'pending')
+    assert eachlabs.triggered == 1
+
+def test_unknown_execution_is_not_tracked(client):
+    response = client.get("/status/no-such-execution", headers=HEADERS)
+    assert response.status_code == 500
+    assert "no-such-execution" not in execution_poller.pending_ids